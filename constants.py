@@ -0,0 +1,12 @@
+"""
+Shared constants for the E20 simulator.
+"""
+
+# Main memory: 2**15 16-bit cells, addressed by a 15-bit address.
+MEM_SIZE = 2 ** 15
+
+# Register file: 8 16-bit registers, $0 is hard-wired to zero.
+NUM_REGS = 8
+
+# Registers hold 16-bit values.
+REG_SIZE = 2 ** 16
@@ -0,0 +1,805 @@
+#!/usr/bin/python3
+"""
+CS-UY 2214 - Project 3
+simcache.py
+
+Simulates an E20 program together with an optional one- or two-level
+data cache, printing one log entry per cache access.
+"""
+
+import argparse
+import queue
+import re
+import sys
+import threading
+from array import array
+
+import constants
+
+# numpy and numba are optional. With numba the whole execution loop
+# runs as compiled native code; with only numpy, wide cache sets get a
+# vectorized way search; with neither, the pure-Python paths are used.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def load_machine_code(machine_code, mem):
+    """
+    Loads the full text of an E20 machine code file into the mutable
+    sequence provided by mem. All lines are parsed with one regex pass
+    and stored with one bulk slice assignment instead of per-line
+    matching and indexing.
+
+    sig: str -> array -> NoneType
+    """
+    machine_code_re = re.compile("^ram\\[(\\d+)\\] = 16'b(\\d+);.*$", re.M)
+    matches = machine_code_re.findall(machine_code)
+    lines = machine_code.splitlines()
+    if len(matches) != len(lines):
+        line_re = re.compile("^ram\\[(\\d+)\\] = 16'b(\\d+);.*$")
+        for line in lines:
+            if not line_re.match(line):
+                raise ValueError("Can't parse line: %s" % line)
+    addrs = [int(a, 10) for a, _ in matches]
+    if addrs != list(range(len(addrs))):
+        for expected, addr in enumerate(addrs):
+            if addr != expected:
+                raise ValueError("Memory addresses encountered out of sequence: %s" % addr)
+    if len(addrs) > len(mem):
+        raise ValueError("Program too big for memory")
+    mem[:len(addrs)] = array('H', [int(b, 2) for _, b in matches])
+
+
+def print_cache_config(cache_name, size, assoc, blocksize, num_lines):
+    """
+    Prints out the correctly-formatted configuration of a cache.
+
+    sig: str -> int -> int -> int -> int -> NoneType
+    """
+    summary = "Cache %s has size %s, associativity %s, blocksize %s, lines %s" % (
+        cache_name, size, assoc, blocksize, num_lines)
+    print(summary)
+
+
+# Log entries are buffered and written in bulk: one write call per
+# chunk instead of one print per cache access. On a tty the buffer is
+# flushed periodically so output stays visible during long runs.
+_log_buf = []
+_FLUSH_EVERY = 4096
+_stdout_isatty = sys.stdout.isatty()
+
+
+def print_log_entry(cache_name, status, pc, addr, line):
+    """
+    Buffers a correctly-formatted log entry for output.
+
+    sig: str -> str -> int -> int -> int -> NoneType
+    """
+    _log_buf.append(f"{cache_name + ' ' + status:8s} "
+                    f"pc:{pc:5d}\taddr:{addr:5d}\tline:{line:4d}")
+    if _stdout_isatty and len(_log_buf) >= _FLUSH_EVERY:
+        flush_log()
+
+
+def flush_log():
+    """
+    Writes all buffered log entries to stdout.
+
+    sig: NoneType
+    """
+    if _log_buf:
+        sys.stdout.write("\n".join(_log_buf))
+        sys.stdout.write("\n")
+        _log_buf.clear()
+
+
+def sign_extend(imm7):
+    """
+    Sign-extends a 7-bit immediate to a Python int. Branchless: when
+    bit 6 is set this subtracts 128, otherwise it subtracts 0.
+
+    sig: int -> int
+    """
+    return imm7 - ((imm7 & 0x40) << 1)
+
+
+# Each opcode handler takes (pc, regs, memory) plus the pre-decoded
+# fields of the instruction and returns (new_pc, halt, mem_addr), where
+# mem_addr is None except for lw/sw. rA/rB/rD are the three register
+# fields from high bits to low; imm is the sign-extended 7-bit
+# immediate, except for j/jal where it is the 13-bit jump target.
+
+def threereg(pc, regs, memory, rA, rB, rD, imm, func):
+    """
+    Executes a three-register instruction (add, sub, or, and, slt, jr),
+    distinguished by the low 4 bits.
+
+    sig: int -> array -> array -> int -> int -> int -> int ->
+         int -> (int, bool, NoneType)
+    """
+    if func == 0b1000:  # jr
+        return regs[rA], False, None
+    if func == 0b0000:  # add
+        val = regs[rA] + regs[rB]
+    elif func == 0b0001:  # sub
+        val = regs[rA] - regs[rB]
+    elif func == 0b0010:  # or
+        val = regs[rA] | regs[rB]
+    elif func == 0b0011:  # and
+        val = regs[rA] & regs[rB]
+    else:  # slt
+        val = 1 if regs[rA] < regs[rB] else 0
+    if rD != 0:
+        regs[rD] = val & 0xFFFF
+    return pc + 1, False, None
+
+
+def slti(pc, regs, memory, rA, rB, rD, imm, func):
+    """
+    Executes slti (opcode 0b001).
+
+    sig: int -> array -> array -> int -> int -> int -> int ->
+         int -> (int, bool, NoneType)
+    """
+    if rB != 0:
+        regs[rB] = 1 if regs[rA] < (imm & 0xFFFF) else 0
+    return pc + 1, False, None
+
+
+def addi(pc, regs, memory, rA, rB, rD, imm, func):
+    """
+    Executes addi (opcode 0b111).
+
+    sig: int -> array -> array -> int -> int -> int -> int ->
+         int -> (int, bool, NoneType)
+    """
+    if rB != 0:
+        regs[rB] = (regs[rA] + imm) & 0xFFFF
+    return pc + 1, False, None
+
+
+def lw(pc, regs, memory, rA, rB, rD, imm, func):
+    """
+    Executes lw (opcode 0b100). Returns the memory address read so the
+    caller can update the cache state.
+
+    sig: int -> array -> array -> int -> int -> int -> int ->
+         int -> (int, bool, int)
+    """
+    addr = (regs[rA] + imm) & (constants.MEM_SIZE - 1)
+    if rB != 0:
+        regs[rB] = memory[addr]
+    return pc + 1, False, addr
+
+
+def sw(pc, regs, memory, rA, rB, rD, imm, func):
+    """
+    Executes sw (opcode 0b101). Returns the memory address written so
+    the caller can update the cache state.
+
+    sig: int -> array -> array -> int -> int -> int -> int ->
+         int -> (int, bool, int)
+    """
+    addr = (regs[rA] + imm) & (constants.MEM_SIZE - 1)
+    memory[addr] = regs[rB]
+    return pc + 1, False, addr
+
+
+def jeq(pc, regs, memory, rA, rB, rD, imm, func):
+    """
+    Executes jeq (opcode 0b110).
+
+    sig: int -> array -> array -> int -> int -> int -> int ->
+         int -> (int, bool, NoneType)
+    """
+    if regs[rA] == regs[rB]:
+        return pc + 1 + imm, False, None
+    return pc + 1, False, None
+
+
+def j(pc, regs, memory, rA, rB, rD, imm, func):
+    """
+    Executes j (opcode 0b010). A jump to the current pc halts the
+    machine.
+
+    sig: int -> array -> array -> int -> int -> int -> int ->
+         int -> (int, bool, NoneType)
+    """
+    return imm, imm == pc, None
+
+
+def jal(pc, regs, memory, rA, rB, rD, imm, func):
+    """
+    Executes jal (opcode 0b011).
+
+    sig: int -> array -> array -> int -> int -> int -> int ->
+         int -> (int, bool, NoneType)
+    """
+    regs[7] = (pc + 1) & 0xFFFF
+    return imm, imm == pc, None
+
+
+# Indexed by the top-3-bit opcode.
+HANDLERS = [threereg, slti, j, jal, lw, sw, jeq, addi]
+
+
+def decode_word(memory, i, d_op, d_rA, d_rB, d_rD, d_imm, d_func):
+    """
+    Decodes memory[i] into the parallel decoded-field arrays. Words are
+    decoded once up front and again only when a sw overwrites them; an
+    overwritten word is marked with the invalid opcode 0xFF in d_op.
+
+    sig: array -> int -> bytearray -> array -> array -> array ->
+         array -> array -> NoneType
+    """
+    instr = memory[i]
+    op = instr >> 13
+    d_op[i] = op
+    d_rA[i] = (instr >> 10) & 7
+    d_rB[i] = (instr >> 7) & 7
+    d_rD[i] = (instr >> 4) & 7
+    d_func[i] = instr & 0xF
+    if op == 0b010 or op == 0b011:
+        d_imm[i] = instr & 0x1FFF
+    else:
+        d_imm[i] = sign_extend(instr & 0x7F)
+
+
+def access_cache(sets, assoc, blocksize, numlines, name, is_lw, pc, addr):
+    """
+    Performs one access to a cache, updating its LRU state and printing
+    the log entry. Each set is a list of tags kept in MRU-first order,
+    so a hit just moves the tag to the front and an eviction pops the
+    tail. Returns the status of the access ("HIT", "MISS", or "SW").
+
+    sig: list(list(int)) -> int -> int -> int -> str ->
+         bool -> int -> int -> str
+    """
+    blockid = addr // blocksize
+    line = blockid % numlines
+    tag = blockid // numlines
+    s = sets[line]
+    try:
+        i = s.index(tag)
+    except ValueError:
+        i = -1
+    if i != -1:
+        status = "HIT" if is_lw else "SW"
+        if i:
+            s.insert(0, s.pop(i))
+    else:
+        status = "MISS" if is_lw else "SW"
+        if len(s) == assoc:
+            s.pop()
+        s.insert(0, tag)
+    print_log_entry(name, status, pc, addr, line)
+    return status
+
+
+def access_cache_direct(tags, assoc, blocksize, numlines, name,
+                        is_lw, pc, addr):
+    """
+    Fast path for a direct-mapped cache (assoc == 1): each line holds a
+    single tag, so there is no way search and no replacement policy,
+    just one compare and an overwrite on miss. Same signature and
+    return value as access_cache; tags is a flat per-line list with -1
+    marking an empty line.
+
+    sig: list(int) -> int -> int -> int -> str ->
+         bool -> int -> int -> str
+    """
+    blockid = addr // blocksize
+    line = blockid % numlines
+    tag = blockid // numlines
+    if tags[line] == tag:
+        status = "HIT" if is_lw else "SW"
+    else:
+        status = "MISS" if is_lw else "SW"
+        tags[line] = tag
+    print_log_entry(name, status, pc, addr, line)
+    return status
+
+
+def access_cache_vector(state, assoc, blocksize, numlines, name,
+                        is_lw, pc, addr):
+    """
+    Vectorized path for wide sets: tags and timestamps live in
+    (numlines, assoc) numpy arrays, so the way search and the LRU
+    victim argmin run in C over the whole row instead of a Python loop.
+    state is [tags, times, tick], with tick the access counter that
+    stamps last-use times. Same signature and return value as
+    access_cache.
+
+    sig: list -> int -> int -> int -> str -> bool -> int -> int -> str
+    """
+    tags, times, tick = state
+    state[2] = tick = tick + 1
+    blockid = addr // blocksize
+    line = blockid % numlines
+    tag = blockid // numlines
+    row = tags[line]
+    hit = np.where(row == tag)[0]
+    if hit.size:
+        status = "HIT" if is_lw else "SW"
+        times[line, hit[0]] = tick
+    else:
+        status = "MISS" if is_lw else "SW"
+        invalid = np.where(row == -1)[0]
+        slot = invalid[0] if invalid.size else int(times[line].argmin())
+        tags[line, slot] = tag
+        times[line, slot] = tick
+    print_log_entry(name, status, pc, addr, line)
+    return status
+
+
+def collect_mem_trace(memory, regs):
+    """
+    Executes the E20 program to completion and returns the list of
+    data-memory addresses accessed by lw and sw, in order.
+
+    sig: array -> array -> list(int)
+    """
+    trace = []
+    pc = 0
+    halt = False
+    mem_mask = constants.MEM_SIZE - 1
+    while not halt:
+        instr = memory[pc]
+        op = instr >> 13
+        if op == 0b010 or op == 0b011:
+            imm = instr & 0x1FFF
+        else:
+            imm = sign_extend(instr & 0x7F)
+        pc, halt, addr = HANDLERS[op](pc, regs, memory, (instr >> 10) & 7,
+                                      (instr >> 7) & 7, (instr >> 4) & 7,
+                                      imm, instr & 0xF)
+        pc &= mem_mask
+        if addr is not None:
+            trace.append(addr)
+    return trace
+
+
+def sweep_caches(configs, trace):
+    """
+    Computes exact hit counts for several cache configurations from a
+    single pass over a memory-access trace. By LRU inclusion, an access
+    hits in a set-associative LRU cache exactly when its stack distance
+    within its set is smaller than the associativity, so configs that
+    share a number of lines share one stack walk and differ only in
+    where the distance histogram is cut. All configs must use the same
+    blocksize. Returns {(size, assoc, blocksize): hit_count}.
+
+    sig: list((int, int, int)) -> list(int) -> dict
+    """
+    blocksize = configs[0][2]
+    groups = {}
+    for size, assoc, _ in configs:
+        numlines = size // (assoc * blocksize)
+        groups.setdefault(numlines, []).append((size, assoc))
+    results = {}
+    for numlines, members in groups.items():
+        stacks = [[] for _ in range(numlines)]
+        max_assoc = max(assoc for _, assoc in members)
+        # distances >= max_assoc miss in every member, so lump them
+        hist = [0] * (max_assoc + 1)
+        for addr in trace:
+            block = addr // blocksize
+            s = stacks[block % numlines]
+            tag = block // numlines
+            try:
+                depth = s.index(tag)
+            except ValueError:
+                depth = max_assoc
+            if depth:
+                if depth < max_assoc:
+                    s.pop(depth)
+                elif len(s) == max_assoc:
+                    s.pop()
+                s.insert(0, tag)
+            hist[min(depth, max_assoc)] += 1
+        for size, assoc in members:
+            results[(size, assoc, blocksize)] = sum(hist[:assoc])
+    return results
+
+
+# Status codes used by the compiled core's event log.
+STATUS_NAMES = ("HIT", "MISS", "SW")
+
+if njit is not None:
+    @njit(cache=True)
+    def _access_cache_compiled(tags, times, assoc, blocksize, numlines,
+                               is_lw, addr, global_time):
+        """
+        Compiled version of access_cache. Returns (status_code, line),
+        with status_code indexing STATUS_NAMES.
+        """
+        blockid = addr // blocksize
+        line = blockid % numlines
+        tag = blockid // numlines
+        base = line * assoc
+        hit_way = -1
+        for way in range(base, base + assoc):
+            if tags[way] == tag:
+                hit_way = way
+                break
+        if hit_way != -1:
+            status = 0 if is_lw else 2
+            times[hit_way] = global_time
+        else:
+            status = 1 if is_lw else 2
+            victim = -1
+            for way in range(base, base + assoc):
+                if tags[way] == -1:
+                    victim = way
+                    break
+            if victim == -1:
+                victim = base
+                for way in range(base + 1, base + assoc):
+                    if times[way] < times[victim]:
+                        victim = way
+            tags[victim] = tag
+            times[victim] = global_time
+        return status, line
+
+    @njit(cache=True)
+    def _run_compiled(memory, regs, levels,
+                      L1_tags, L1_time, L1assoc, L1blocksize, numlines_1,
+                      L2_tags, L2_time, L2assoc, L2blocksize, numlines_2):
+        """
+        Executes the whole E20 program as a compiled loop. levels is the
+        number of caches being simulated (0, 1, or 2). Returns an array
+        of cache log events, one (level, status, pc, addr, line) row per
+        entry.
+        """
+        mem_size = memory.shape[0]
+        events = np.empty((1024, 5), np.int64)
+        n = 0
+        pc = 0
+        global_time = 0
+        halt = False
+        while not halt:
+            instr = memory[pc]
+            opcode = instr >> 13
+            oldpc = pc
+            addr = -1
+            if opcode == 0b000:
+                srcA = (instr >> 10) & 7
+                srcB = (instr >> 7) & 7
+                dst = (instr >> 4) & 7
+                func = instr & 0xF
+                if func == 0b1000:  # jr
+                    pc = regs[srcA]
+                else:
+                    if func == 0b0000:
+                        val = regs[srcA] + regs[srcB]
+                    elif func == 0b0001:
+                        val = regs[srcA] - regs[srcB]
+                    elif func == 0b0010:
+                        val = regs[srcA] | regs[srcB]
+                    elif func == 0b0011:
+                        val = regs[srcA] & regs[srcB]
+                    else:
+                        val = 1 if regs[srcA] < regs[srcB] else 0
+                    if dst != 0:
+                        regs[dst] = val & 0xFFFF
+                    pc = pc + 1
+            elif opcode == 0b001:  # slti
+                src = (instr >> 10) & 7
+                dst = (instr >> 7) & 7
+                imm7 = instr & 0x7F
+                imm = imm7 - ((imm7 & 0x40) << 1)
+                if dst != 0:
+                    regs[dst] = 1 if regs[src] < (imm & 0xFFFF) else 0
+                pc = pc + 1
+            elif opcode == 0b111:  # addi
+                src = (instr >> 10) & 7
+                dst = (instr >> 7) & 7
+                imm7 = instr & 0x7F
+                imm = imm7 - ((imm7 & 0x40) << 1)
+                if dst != 0:
+                    regs[dst] = (regs[src] + imm) & 0xFFFF
+                pc = pc + 1
+            elif opcode == 0b100 or opcode == 0b101:  # lw / sw
+                addr_reg = (instr >> 10) & 7
+                data_reg = (instr >> 7) & 7
+                imm7 = instr & 0x7F
+                imm = imm7 - ((imm7 & 0x40) << 1)
+                addr = (regs[addr_reg] + imm) & (mem_size - 1)
+                if opcode == 0b100:
+                    if data_reg != 0:
+                        regs[data_reg] = memory[addr]
+                else:
+                    memory[addr] = regs[data_reg]
+                pc = pc + 1
+            elif opcode == 0b110:  # jeq
+                regA = (instr >> 10) & 7
+                regB = (instr >> 7) & 7
+                imm7 = instr & 0x7F
+                imm = imm7 - ((imm7 & 0x40) << 1)
+                if regs[regA] == regs[regB]:
+                    pc = pc + 1 + imm
+                else:
+                    pc = pc + 1
+            else:  # j / jal
+                if opcode == 0b011:
+                    regs[7] = (pc + 1) & 0xFFFF
+                imm = instr & 0x1FFF
+                halt = imm == pc
+                pc = imm
+            pc &= mem_size - 1
+            if addr != -1 and levels > 0:
+                global_time += 1
+                is_lw = opcode == 0b100
+                status, line = _access_cache_compiled(
+                    L1_tags, L1_time, L1assoc, L1blocksize, numlines_1,
+                    is_lw, addr, global_time)
+                if n == events.shape[0]:
+                    bigger = np.empty((n * 2, 5), np.int64)
+                    bigger[:n] = events
+                    events = bigger
+                events[n, 0] = 1
+                events[n, 1] = status
+                events[n, 2] = oldpc
+                events[n, 3] = addr
+                events[n, 4] = line
+                n += 1
+                if levels > 1 and status != 0:
+                    status, line = _access_cache_compiled(
+                        L2_tags, L2_time, L2assoc, L2blocksize, numlines_2,
+                        is_lw, addr, global_time)
+                    if n == events.shape[0]:
+                        bigger = np.empty((n * 2, 5), np.int64)
+                        bigger[:n] = events
+                        events = bigger
+                    events[n, 0] = 2
+                    events[n, 1] = status
+                    events[n, 2] = oldpc
+                    events[n, 3] = addr
+                    events[n, 4] = line
+                    n += 1
+        return events[:n]
+
+
+def predecode(memory):
+    """
+    Builds the parallel decoded-field arrays for every memory word.
+
+    sig: array -> (bytearray, array, array, array, array, array)
+    """
+    d_op = bytearray(constants.MEM_SIZE)
+    d_rA = array('b', [0] * constants.MEM_SIZE)
+    d_rB = array('b', [0] * constants.MEM_SIZE)
+    d_rD = array('b', [0] * constants.MEM_SIZE)
+    d_imm = array('h', [0] * constants.MEM_SIZE)
+    d_func = array('b', [0] * constants.MEM_SIZE)
+    for i in range(constants.MEM_SIZE):
+        decode_word(memory, i, d_op, d_rA, d_rB, d_rD, d_imm, d_func)
+    return d_op, d_rA, d_rB, d_rD, d_imm, d_func
+
+
+def run_no_cache(memory, regs):
+    """
+    Executes the E20 program with no cache simulation. Separate from
+    run_with_cache so the plain simulator pays no cache dispatch at all
+    in its inner loop.
+
+    sig: array -> array -> NoneType
+    """
+    d_op, d_rA, d_rB, d_rD, d_imm, d_func = predecode(memory)
+    _handlers = HANDLERS
+    _decode = decode_word
+    mem_mask = constants.MEM_SIZE - 1
+    pc = 0
+    halt = False
+    while not halt:
+        op = d_op[pc]
+        if op == 0xFF:
+            _decode(memory, pc, d_op, d_rA, d_rB, d_rD, d_imm, d_func)
+            op = d_op[pc]
+        oldpc = pc
+        pc, halt, addr = _handlers[op](pc, regs, memory, d_rA[oldpc],
+                                       d_rB[oldpc], d_rD[oldpc],
+                                       d_imm[oldpc], d_func[oldpc])
+        pc &= mem_mask
+        if addr is not None and op == 0b101:
+            d_op[addr] = 0xFF  # sw: handle self-modifying code
+
+
+def consume_cache_events(q, l1, l2):
+    """
+    Drains (pc, addr, is_lw) events from the queue and performs both
+    levels' cache bookkeeping and logging, until the None sentinel.
+    Runs on its own thread; it is the only thread that appends log
+    entries during the run, so entry order is preserved.
+
+    sig: SimpleQueue -> tuple -> tuple -> NoneType
+    """
+    L1_access, L1_sets, L1assoc, L1blocksize, numlines_1 = l1
+    if l2 is not None:
+        L2_access, L2_sets, L2assoc, L2blocksize, numlines_2 = l2
+    get = q.get
+    while True:
+        event = get()
+        if event is None:
+            return
+        pc, addr, is_lw = event
+        L1_status = L1_access(L1_sets, L1assoc, L1blocksize,
+                              numlines_1, "L1", is_lw, pc, addr)
+        if l2 is not None and L1_status != "HIT":
+            L2_access(L2_sets, L2assoc, L2blocksize,
+                      numlines_2, "L2", is_lw, pc, addr)
+
+
+def run_with_cache(memory, regs, l1, l2):
+    """
+    Executes the E20 program while simulating one or two caches. l1 and
+    l2 each bundle a level's chosen access function and state as
+    (access, sets, assoc, blocksize, numlines); l2 is None for a
+    single-cache run. The interpreter pushes one event per lw/sw onto a
+    queue drained by a consumer thread, overlapping cache bookkeeping
+    and log formatting with instruction execution.
+
+    sig: array -> array -> tuple -> tuple -> NoneType
+    """
+    d_op, d_rA, d_rB, d_rD, d_imm, d_func = predecode(memory)
+    _handlers = HANDLERS
+    _decode = decode_word
+    mem_mask = constants.MEM_SIZE - 1
+    q = queue.SimpleQueue()
+    put = q.put
+    consumer = threading.Thread(target=consume_cache_events,
+                                args=(q, l1, l2))
+    consumer.start()
+    pc = 0
+    halt = False
+    try:
+        while not halt:
+            op = d_op[pc]
+            if op == 0xFF:
+                _decode(memory, pc, d_op, d_rA, d_rB, d_rD, d_imm, d_func)
+                op = d_op[pc]
+            oldpc = pc
+            pc, halt, addr = _handlers[op](pc, regs, memory, d_rA[oldpc],
+                                           d_rB[oldpc], d_rD[oldpc],
+                                           d_imm[oldpc], d_func[oldpc])
+            pc &= mem_mask
+            if addr is not None:
+                if op == 0b101:  # sw: handle self-modifying code
+                    d_op[addr] = 0xFF
+                put((oldpc, addr, op == 0b100))
+    finally:
+        put(None)
+        consumer.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate E20 cache')
+    parser.add_argument('filename', help='The file containing machine code, typically with .bin suffix')
+    parser.add_argument('--cache', help='Cache configuration: size,associativity,blocksize (for one cache) '
+                        'or size,associativity,blocksize,size,associativity,blocksize (for two caches)')
+    parser.add_argument('--cache-sweep', help='Evaluate several cache configurations in one run: '
+                        'size,associativity,blocksize configs separated by ";" '
+                        '(all configs must share one blocksize)')
+    cmdline = parser.parse_args()
+
+    # unboxed 16-bit storage: 2 bytes per cell instead of a PyLong
+    # pointer, and indexing returns plain ints
+    memory = array('H', [0] * constants.MEM_SIZE)
+    regs = array('H', [0] * constants.NUM_REGS)
+
+    with open(cmdline.filename) as file:
+        load_machine_code(file.read(), memory)
+
+    if cmdline.cache_sweep is not None:
+        if cmdline.cache is not None:
+            raise Exception("Cannot combine --cache and --cache-sweep")
+        configs = []
+        for part in cmdline.cache_sweep.split(";"):
+            vals = [int(x) for x in part.split(",")]
+            if len(vals) != 3:
+                raise Exception("Invalid cache config")
+            configs.append(tuple(vals))
+        if len(set(blocksize for _, _, blocksize in configs)) != 1:
+            raise Exception("All sweep configs must share one blocksize")
+        trace = collect_mem_trace(memory, regs)
+        results = sweep_caches(configs, trace)
+        for size, assoc, blocksize in configs:
+            hits = results[(size, assoc, blocksize)]
+            print("Cache size %s, associativity %s, blocksize %s: "
+                  "%s hits / %s accesses" % (size, assoc, blocksize,
+                                             hits, len(trace)))
+        return
+
+    twocache = False
+    usecache = cmdline.cache is not None
+    if usecache:
+        parts = cmdline.cache.split(",")
+        if len(parts) == 3:
+            [L1size, L1assoc, L1blocksize] = [int(x) for x in parts]
+        elif len(parts) == 6:
+            [L1size, L1assoc, L1blocksize, L2size, L2assoc, L2blocksize] = [int(x) for x in parts]
+            twocache = True
+        else:
+            raise Exception("Invalid cache config")
+        numlines_1 = L1size // (L1assoc * L1blocksize)
+        print_cache_config("L1", L1size, L1assoc, L1blocksize, numlines_1)
+        if twocache:
+            numlines_2 = L2size // (L2assoc * L2blocksize)
+            print_cache_config("L2", L2size, L2assoc, L2blocksize, numlines_2)
+
+    if njit is not None:
+        dummy_tags = np.empty(0, np.int64)
+        dummy_time = np.empty(0, np.int64)
+        if usecache:
+            levels = 2 if twocache else 1
+            l1_tags = np.full(numlines_1 * L1assoc, -1, np.int64)
+            l1_time = np.zeros(numlines_1 * L1assoc, np.int64)
+            if twocache:
+                l2_tags = np.full(numlines_2 * L2assoc, -1, np.int64)
+                l2_time = np.zeros(numlines_2 * L2assoc, np.int64)
+            else:
+                l2_tags, l2_time = dummy_tags, dummy_time
+                L2assoc = L2blocksize = numlines_2 = 1
+        else:
+            levels = 0
+            l1_tags = l2_tags = dummy_tags
+            l1_time = l2_time = dummy_time
+            L1assoc = L1blocksize = numlines_1 = 1
+            L2assoc = L2blocksize = numlines_2 = 1
+        events = _run_compiled(
+            np.array(memory, np.int64), np.zeros(constants.NUM_REGS, np.int64),
+            levels,
+            l1_tags, l1_time, L1assoc, L1blocksize, numlines_1,
+            l2_tags, l2_time, L2assoc, L2blocksize, numlines_2)
+        for level, status, epc, eaddr, eline in events:
+            print_log_entry("L1" if level == 1 else "L2",
+                            STATUS_NAMES[status], epc, eaddr, eline)
+        flush_log()
+        return
+
+    if usecache:
+        # direct-mapped caches use a flat tag-per-line list and skip the
+        # LRU machinery; narrow sets keep MRU-first tag lists; wide sets
+        # use 2D numpy tag/timestamp arrays searched in C when available
+        if L1assoc == 1:
+            L1_sets = [-1] * numlines_1
+            L1_access = access_cache_direct
+        elif np is not None and L1assoc > 4:
+            L1_sets = [np.full((numlines_1, L1assoc), -1, np.int32),
+                       np.zeros((numlines_1, L1assoc), np.int64), 0]
+            L1_access = access_cache_vector
+        else:
+            L1_sets = [[] for _ in range(numlines_1)]
+            L1_access = access_cache
+        if twocache:
+            if L2assoc == 1:
+                L2_sets = [-1] * numlines_2
+                L2_access = access_cache_direct
+            elif np is not None and L2assoc > 4:
+                L2_sets = [np.full((numlines_2, L2assoc), -1, np.int32),
+                           np.zeros((numlines_2, L2assoc), np.int64), 0]
+                L2_access = access_cache_vector
+            else:
+                L2_sets = [[] for _ in range(numlines_2)]
+                L2_access = access_cache
+
+    if usecache:
+        l2 = (L2_access, L2_sets, L2assoc, L2blocksize,
+              numlines_2) if twocache else None
+        run_with_cache(memory, regs,
+                       (L1_access, L1_sets, L1assoc, L1blocksize,
+                        numlines_1), l2)
+    else:
+        run_no_cache(memory, regs)
+    flush_log()
+
+
+if __name__ == "__main__":
+    main()